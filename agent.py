@@ -2,14 +2,98 @@ import os
 import json
 import sys
 import platform
-import psutil
-import requests
 import importlib.util
+import codecs
+import copy
+import functools
+import mmap
 import re
 import time
 import uuid
-import shlex
-from typing import Dict, List, Union, Optional, Any, Tuple
+import threading
+from collections import deque
+from types import ModuleType
+from typing import Dict, List, Union, Optional, Any, Tuple, FrozenSet
+
+# 超过该大小的JSON文件通过mmap映射后解析，不再整块读入内存
+_MMAP_THRESHOLD = 64 * 1024
+
+# 热路径上的JSON编解码：安装了orjson时使用orjson，否则回退到标准库json
+try:
+    import orjson
+    
+    def _json_loads(data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+    
+    # orjson不支持超出64位范围的整数，模型给出的工具参数可能包含这样的整数，
+    # 编码失败时回退到标准库json（orjson.JSONEncodeError是TypeError的子类）
+    def _json_dumps(obj: Any) -> str:
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            return json.dumps(obj, ensure_ascii=False)
+    
+    def _json_dumpb(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+    
+    def _json_load_file(f) -> Any:
+        # 大文件直接映射到内存交给orjson解析，省去缓冲读取与复制
+        if os.fstat(f.fileno()).st_size > _MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    return orjson.loads(view)
+                finally:
+                    view.release()
+        return orjson.loads(f.read())
+except ImportError:
+    def _json_loads(data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+    
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+    
+    def _json_dumpb(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+    
+    def _json_load_file(f) -> Any:
+        # 标准库json不接受mmap对象，直接读取字节（json.loads会自动识别UTF-8编码）
+        return json.loads(f.read())
+
+# 已解析的JSON文件缓存: 绝对路径 -> (修改时间ns, 解析结果)，文件修改后替换原条目
+_json_cache: Dict[str, Tuple[int, Any]] = {}
+
+
+def load_json_cached(path: str) -> Any:
+    """读取并解析JSON文件，文件未修改时省去读取和解析，直接复制缓存的结果
+    
+    每次返回独立的副本，调用方修改返回的对象不会影响缓存或其他调用方。
+    
+    Args:
+        path: JSON文件路径
+        
+    Returns:
+        解析后的JSON对象
+    """
+    abs_path = os.path.abspath(path)
+    mtime_ns = os.stat(abs_path).st_mtime_ns
+    cached = _json_cache.get(abs_path)
+    if cached is not None and cached[0] == mtime_ns:
+        data = cached[1]
+    else:
+        # 以二进制读取，省去文本层的解码，解码与解析由JSON库一次完成
+        with open(abs_path, 'rb') as f:
+            data = _json_load_file(f)
+        _json_cache[abs_path] = (mtime_ns, data)
+    return copy.deepcopy(data)
+
+
+# 已加载的工具模块缓存: (绝对路径, 修改时间ns) -> 模块对象，多个ToolManager实例共享
+_tool_module_cache: Dict[Tuple[str, int], ModuleType] = {}
+
 
 class ConfigManager:
     """配置管理器：处理config.json文件"""
@@ -22,8 +106,7 @@ class ConfigManager:
         """加载配置文件"""
         if os.path.exists(self.config_path):
             try:
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return load_json_cached(self.config_path)
             except Exception as e:
                 print(f"读取配置文件失败: {e}")
                 return {}
@@ -36,97 +119,59 @@ class ConfigManager:
         return self.config
 
 
-class SecurityManager:
-    """安全管理器：处理敏感命令检查和确认"""
-    
-    def __init__(self, security_config_path: str = "security.json"):
-        self.security_config_path = security_config_path
-        self.sensitive_commands = []
-        self.load_security_config()
+def _keyword_parameters(func) -> Optional[FrozenSet[str]]:
+    """获取函数可以按关键字传入的参数名；函数接受**kwargs时返回None，表示任意关键字参数都可传入"""
+    # 延迟导入: inspect本身会导入大量模块，仅在加载工具模块时才需要
+    import inspect
     
-    def load_security_config(self) -> None:
-        """加载安全配置文件"""
-        if os.path.exists(self.security_config_path):
-            try:
-                with open(self.security_config_path, 'r', encoding='utf-8') as f:
-                    security_config = json.load(f)
-                    self.sensitive_commands = security_config.get("sensitive_commands", [])
-                    print(f"已加载 {len(self.sensitive_commands)} 个敏感命令定义")
-            except Exception as e:
-                print(f"加载安全配置失败: {e}")
-                self.sensitive_commands = []
-        else:
-            print(f"警告: 未找到安全配置文件 {self.security_config_path}。敏感命令检查已禁用。")
-            self.sensitive_commands = []
-    
-    def is_sensitive_command(self, command: str) -> Tuple[bool, str]:
-        """检查命令是否为敏感命令
-        
-        Args:
-            command: 要检查的命令
-            
-        Returns:
-            (是否敏感, 敏感描述)
-        """
-        if not self.sensitive_commands:
-            return False, ""
-            
-        current_os = platform.system().lower()
-        # 解析命令获取第一个部分（命令名）
-        try:
-            cmd_parts = shlex.split(command)
-            if not cmd_parts:
-                return False, ""
-            
-            base_cmd = cmd_parts[0].lower()
-            
-            # 检查是否为定义的敏感命令
-            for sensitive_cmd in self.sensitive_commands:
-                pattern = sensitive_cmd.get("pattern", "").lower()
-                # 检查操作系统兼容性
-                cmd_os = sensitive_cmd.get("os", [])
-                
-                # 如果该命令适用于当前操作系统
-                if not cmd_os or current_os in cmd_os:
-                    # 精确匹配命令开头
-                    if base_cmd == pattern or base_cmd.startswith(pattern + " "):
-                        return True, sensitive_cmd.get("description", "敏感命令")
-                    
-                    # 检查命令选项中的敏感模式
-                    if pattern in command:
-                        return True, sensitive_cmd.get("description", "敏感命令")
-            
-            return False, ""
-            
-        except Exception as e:
-            print(f"检查敏感命令异常: {e}")
-            return False, ""
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        # 无法获取签名时视为不接受任何额外的关键字参数
+        return frozenset()
+    if any(p.kind is p.VAR_KEYWORD for p in parameters):
+        return None
+    return frozenset(p.name for p in parameters if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
 
 
 class ToolManager:
-    """工具管理器：加载和管理工具"""
+    """工具管理器：加载和管理工具
+    
+    工具模块在首次通过get_tool_function获取时才加载，未使用的工具不产生导入开销。
+    """
+    
+    # 内置工具: 工具名 -> (实现方法名, 描述)；tools.json中的同名定义会被忽略
+    _BUILTIN_TOOLS: Dict[str, Tuple[str, str]] = {
+        "exit": ("exit_program", "结束当前任务"),
+    }
     
     def __init__(self, tools_path: str = "tools.json", tools_dir: str = "tools"):
         self.tools_path = tools_path
         self.tools_dir = tools_dir
-        self.tools = {}
+        self.tools = {}  # 已加载的工具: 工具名 -> 函数
+        self._tool_keywords: Dict[str, Optional[FrozenSet[str]]] = {}  # 已加载的工具函数可接受的关键字参数名，None表示不限制
+        self._tool_paths: Dict[str, str] = {}  # 尚未加载的工具: 工具名 -> 实现文件路径
         self.tool_descriptions = {}
-        self.security_manager = SecurityManager()
+        self._tool_names: Tuple[str, ...] = ()  # 工具名元组，工具在启动后不再变化，加载完成时生成一次
+        self.tool_definitions: Optional[Dict] = None  # 已解析的tools.json，读取失败时为None
+        self._load_lock = threading.Lock()  # 实例可被多个会话共享，串行化工具模块的延迟加载
         self.load_tools()
     
     def load_tools(self) -> None:
-        """加载工具定义和实现"""
-        # 确保工具目录存在
-        if not os.path.exists(self.tools_dir):
+        """加载工具定义，记录各工具的实现路径（实现模块延迟到首次使用时加载）"""
+        # 确保工具目录存在（直接创建，已存在时忽略，避免先检查再创建的竞争）
+        try:
             os.makedirs(self.tools_dir)
             print(f"已创建工具目录: {self.tools_dir}")
+        except FileExistsError:
+            pass
         
         # 加载工具定义
         if os.path.exists(self.tools_path):
             try:
-                with open(self.tools_path, 'r', encoding='utf-8') as f:
-                    tool_definitions = json.load(f)
-                    print(f"已加载工具定义: {self.tools_path}")
+                tool_definitions = load_json_cached(self.tools_path)
+                self.tool_definitions = tool_definitions
+                print(f"已加载工具定义: {self.tools_path}")
             except Exception as e:
                 print(f"加载工具定义失败: {e}")
                 tool_definitions = {}
@@ -134,14 +179,15 @@ class ToolManager:
             print(f"错误: 工具定义文件 {self.tools_path} 不存在")
             tool_definitions = {}
         
-        # 内置exit工具
-        self.tools["exit"] = self.exit_program
-        self.tool_descriptions["exit"] = "结束当前任务"
+        # 注册内置工具
+        for tool_name, (method_name, description) in self._BUILTIN_TOOLS.items():
+            self.tools[tool_name] = getattr(self, method_name)
+            self.tool_descriptions[tool_name] = description
         
-        # 逐个加载工具
+        # 记录各工具的实现路径
         for tool_name, tool_info in tool_definitions.items():
-            # 跳过exit工具（已内置）
-            if tool_name == "exit":
+            # 跳过内置工具
+            if tool_name in self._BUILTIN_TOOLS:
                 continue
                 
             # 获取工具描述
@@ -153,12 +199,32 @@ class ToolManager:
                 print(f"警告: 工具 {tool_name} 未指定实现文件，已跳过")
                 continue
             
-            # 加载自定义工具
-            full_path = os.path.join(self.tools_dir, implementation)
-            try:
-                self.load_custom_tool(tool_name, full_path)
-            except Exception as e:
-                print(f"加载工具 {tool_name} 失败: {e}")
+            self._tool_paths[tool_name] = os.path.join(self.tools_dir, implementation)
+        
+        self._tool_names = tuple(self.tool_descriptions)
+    
+    def preload_tools(self) -> None:
+        """立即加载所有尚未加载的工具模块（用于预热，应在开始处理请求之前调用）
+        
+        并发加载，耗时取决于最慢的工具模块而非所有模块之和。
+        约定: 工具模块在导入时不应依赖其他工具模块的导入顺序或共享可变状态。
+        """
+        pending_tools = list(self._tool_paths)
+        if pending_tools:
+            # 仅预热时需要线程池，延迟导入以免拖慢模块加载
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(8, len(pending_tools))) as executor:
+                list(executor.map(self._load_pending_tool, pending_tools))
+    
+    def _load_pending_tool(self, tool_name: str) -> None:
+        """加载一个尚未加载的工具，失败时只打印错误（之后不再重试）"""
+        module_path = self._tool_paths.pop(tool_name, None)
+        if module_path is None:
+            return
+        try:
+            self.load_custom_tool(tool_name, module_path)
+        except Exception as e:
+            print(f"加载工具 {tool_name} 失败: {e}")
     
     def load_custom_tool(self, tool_name: str, module_path: str) -> None:
         """动态加载自定义工具模块"""
@@ -166,17 +232,25 @@ class ToolManager:
             print(f"找不到工具模块: {module_path}")
             return
         
-        # 从文件加载模块
-        spec = importlib.util.spec_from_file_location(tool_name, module_path)
-        if spec is None or spec.loader is None:
-            print(f"无法从 {module_path} 加载模块规范")
-            return
-            
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        # 模块文件未修改时复用已加载的模块，避免重复执行模块代码
+        abs_path = os.path.abspath(module_path)
+        key = (abs_path, os.stat(abs_path).st_mtime_ns)
+        module = _tool_module_cache.get(key)
+        if module is None:
+            # 从文件加载模块
+            spec = importlib.util.spec_from_file_location(tool_name, abs_path)
+            if spec is None or spec.loader is None:
+                print(f"无法从 {module_path} 加载模块规范")
+                return
+                
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _tool_module_cache[key] = module
         
         # 检查模块是否有execute函数
         if hasattr(module, 'execute'):
+            # 先记录签名再注册函数，不加锁读取self.tools的调用方拿到函数时签名已经可用
+            self._tool_keywords[tool_name] = _keyword_parameters(module.execute)
             self.tools[tool_name] = module.execute
         else:
             print(f"工具模块 {module_path} 缺少execute函数")
@@ -185,13 +259,32 @@ class ToolManager:
         """获取所有工具的描述"""
         return self.tool_descriptions
     
+    def get_tool_names(self) -> Tuple[str, ...]:
+        """获取所有工具名（不可变元组，可直接作为缓存键）"""
+        return self._tool_names
+    
+    def get_tool_definitions(self) -> Optional[Dict]:
+        """获取已解析的工具定义（tools.json），读取失败时返回None"""
+        return self.tool_definitions
+    
     def get_tool_function(self, tool_name: str):
-        """获取指定工具的函数"""
-        return self.tools.get(tool_name)
+        """获取指定工具的函数，工具模块尚未加载时在此加载"""
+        tool_function = self.tools.get(tool_name)
+        if tool_function is None:
+            with self._load_lock:
+                if tool_name in self._tool_paths:
+                    self._load_pending_tool(tool_name)
+                tool_function = self.tools.get(tool_name)
+        return tool_function
+    
+    def accepts_argument(self, tool_name: str, arg_name: str) -> bool:
+        """检查已加载的工具函数是否接受指定的关键字参数（按加载时检查的函数签名判断）"""
+        keywords = self._tool_keywords.get(tool_name, frozenset())
+        return keywords is None or arg_name in keywords
     
     def has_tool(self, tool_name: str) -> bool:
-        """检查是否存在指定工具"""
-        return tool_name in self.tools
+        """检查是否存在指定工具（包括尚未加载的工具）"""
+        return tool_name in self.tools or tool_name in self._tool_paths
     
     @staticmethod
     def exit_program(message: str = "任务已完成") -> Dict:
@@ -210,25 +303,173 @@ class ToolManager:
             }
 
 
+@functools.lru_cache(maxsize=1)
+def _get_shared_tool_manager() -> ToolManager:
+    """获取所有会话共享的工具管理器
+    
+    工具定义、安全规则和工具模块在进程内只加载一次，新会话无需重复加载。
+    """
+    return ToolManager()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_static_sysinfo() -> Dict:
+    """获取不随运行变化的系统信息（进程内只探测一次）"""
+    # 延迟导入: psutil只在构建系统提示词时使用
+    import psutil
+    
+    return {
+        "os": platform.system(),
+        "os_version": platform.version(),
+        "python_version": sys.version,
+        "cpu_cores": psutil.cpu_count(logical=True)
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _build_tools_guide(tool_manager: ToolManager) -> str:
+    """构建系统提示词中的工具使用指南（只依赖工具定义，每个工具管理器只构建一次）"""
+    # 获取所有可用工具的描述
+    tool_descriptions = tool_manager.get_tool_descriptions()
+    
+    # 复用ToolManager已解析的tools.json获取参数信息
+    tool_defs = tool_manager.get_tool_definitions()
+    
+    # 构建工具使用指南
+    parts: List[str] = ["你将作为Axiom Agent为用户服务!\n\n【工具使用指南】\n你有以下工具可用，请按需选择最合适的工具:\n\n"]
+    
+    for tool_name, description in tool_descriptions.items():
+        parts.append(f"{tool_name}: {description}\n")
+        
+        # 添加工具调用格式示例
+        parts.append("调用格式: \n```json\n")
+        parts.append(f'{{\n  "name": "{tool_name}",\n  "args": {{\n')
+        
+        if tool_defs is not None:
+            args = tool_defs.get(tool_name, {}).get("args", {})
+            for arg_name, arg_desc in args.items():
+                parts.append(f'    "{arg_name}": "参数值" // {arg_desc}\n')
+        else:
+            # 如果无法读取tools.json，使用通用格式
+            if tool_name == "exit":  
+                parts.append('    "message": "可选的结束消息"\n')
+            else:  
+                parts.append('    "...": "查看tools.json获取此工具的参数"\n')
+        
+        parts.append("  }\n}\n```\n\n")
+    
+    parts.append("""
+【API工作模式】
+- 我作为API服务运行，不再有命令行交互界面
+- 每个用户请求和响应作为独立的API调用处理
+- 用户交互使用异步模式，需要用户在下一次请求中提供输入
+
+【任务执行流程】
+1. 收到新任务时，首先分析任务性质:
+   - 如果是复杂任务：先用info工具提供整体计划
+   - 如果是简单任务：直接使用相应工具执行
+
+2. 使用info工具后:
+   - 必须立即使用其他工具执行实际操作
+   - 不要连续使用info工具
+
+3. 执行步骤:
+   - 使用适当的工具执行具体操作
+   - 使用info工具提供阶段性进展
+   - 使用interact工具在需要用户输入时与用户交互
+   - 使用exit工具结束任务
+
+4. 安全考虑:
+   - 执行危险命令时系统会自动要求用户确认
+   - 确保解释清楚命令的目的和可能的影响
+   - 在执行修改系统状态的命令前先做好检查和备份
+
+【注意事项】
+- 如果你想要展示消息并获得用户的回复，请务必使用interact工具而非info工具
+- 避免重复使用info工具，提供信息后立即执行
+- 每次只返回一个工具调用，不要添加额外说明
+- 大文件内容会自动截断，请提取关键信息处理
+- 保持回答简洁，聚焦于任务目标
+- 交互工具(interact)现在会暂停执行流程，等待下一次用户消息
+- 任务完成时务必使用exit工具结束任务
+""")
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_token_encoding(model_name: Optional[str]):
+    """获取模型对应的tiktoken编码器
+    
+    tiktoken为可选依赖，未安装或无法加载编码时返回None，此时退回按字符数估算。
+    本地没有缓存编码文件时，tiktoken会从网络下载且不设超时，因此只在配置开启use_tiktoken时调用。
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except Exception:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"加载tiktoken编码失败，将按字符数估算令牌数: {e}")
+        return None
+
+
+# 聊天格式中每条消息除内容外的固定开销（角色及分隔标记）的令牌数
+_MESSAGE_TOKEN_OVERHEAD = 4
+
+
 class DialogueManager:
     """对话管理器: 管理与模型的对话历史"""
     
-    def __init__(self, max_tokens: int = 16000):
+    # 每个会话一个实例，使用__slots__省去实例__dict__
+    __slots__ = ('max_tokens', 'system_message', 'messages', 'last_tool_was_info', '_encoding',
+                 '_message_tokens', '_system_tokens', '_total_tokens')
+    
+    def __init__(self, max_tokens: int = 16000, model_name: Optional[str] = None,
+                 use_tiktoken: bool = False):
         self.max_tokens = max_tokens
-        self.messages = []  # 对话历史
+        self.system_message: Optional[Dict] = None  # 系统消息，单独保存，不参与修剪
+        self.messages: deque = deque()  # 对话历史（不含系统消息）
         self.last_tool_was_info = False  # 跟踪上一个工具是否为info
+        self._encoding = _get_token_encoding(model_name) if use_tiktoken else None
+        self._message_tokens: deque = deque()  # 与messages一一对应的令牌数
+        self._system_tokens = 0
+        self._total_tokens = 0  # 对话历史的总令牌数，随消息增删增量维护
+    
+    def _count_tokens(self, content: str) -> int:
+        """计算一条消息占用的令牌数（内容加固定开销），每条消息只计算一次"""
+        if self._encoding is not None:
+            return len(self._encoding.encode(content, disallowed_special=())) + _MESSAGE_TOKEN_OVERHEAD
+        return (len(content) + 3) // 4 + _MESSAGE_TOKEN_OVERHEAD  # 粗略估计: 约4个字符一个令牌
+    
+    def _append_message(self, role: str, content: str) -> None:
+        """追加消息并更新令牌计数，超出令牌限制时修剪最早的消息"""
+        tokens = self._count_tokens(str(content))
+        self.messages.append({"role": role, "content": content})
+        self._message_tokens.append(tokens)
+        self._total_tokens += tokens
+        if self._total_tokens > self.max_tokens:
+            self._trim_history()
     
     def add_system_message(self, content: str) -> None:
-        """添加系统消息"""
-        self.messages.append({"role": "system", "content": content})
+        """设置系统消息（已存在时替换）"""
+        self._total_tokens -= self._system_tokens
+        self.system_message = {"role": "system", "content": content}
+        self._system_tokens = self._count_tokens(str(content))
+        self._total_tokens += self._system_tokens
     
     def add_user_message(self, content: str) -> None:
         """添加用户消息"""
-        self.messages.append({"role": "user", "content": content})
+        self._append_message("user", content)
     
     def add_assistant_message(self, content: str) -> None:
         """添加助手消息"""
-        self.messages.append({"role": "assistant", "content": content})
+        self._append_message("assistant", content)
     
     def add_tool_result(self, tool_call: Dict, result: Dict) -> None:
         """添加工具调用结果作为用户消息
@@ -243,61 +484,150 @@ class DialogueManager:
         # 记录当前工具是否为info
         self.last_tool_was_info = (tool_name == "info")
         
-        # 构建工具结果消息
-        message = f"工具调用结果 ({tool_name})\n"
-        message += f"参数: {json.dumps(tool_args, ensure_ascii=False)}\n"
-        message += f"成功: {result['success']}\n"
-        
-        if result.get("result") is not None:
-            # 截断过长结果
-            result_text = str(result["result"])
-            if len(result_text) > 4000:
-                result_text = result_text[:4000] + f"\n... [内容已截断，共 {len(result_text)} 字符]"
-            message += f"结果:\n{result_text}"
+        # 构建工具结果消息（各部分收集后一次拼接，避免反复复制已拼接的长字符串）
+        parts: List[str] = [
+            f"工具调用结果 ({tool_name})\n",
+            f"参数: {_json_dumps(tool_args)}\n",
+            f"成功: {result['success']}\n"
+        ]
+        
+        raw = result.get("result")
+        if raw is not None:
+            if isinstance(raw, (bytes, bytearray)):
+                # 二进制结果只解码需要保留的前缀，不把整个结果转换成字符串；
+                # 增量解码器不会把截断处不完整的多字节字符替换为乱码，而是直接丢弃
+                total, unit = len(raw), "字节"
+                result_text = codecs.getincrementaldecoder('utf-8')(errors='replace').decode(
+                    raw[:4000], final=total <= 4000)
+            else:
+                result_text = raw if isinstance(raw, str) else str(raw)
+                total, unit = len(result_text), "字符"
+            
+            parts.append("结果:\n")
+            # 截断过长结果，对话历史中只保存截断后的文本
+            if total > 4000:
+                parts.append(result_text[:4000])
+                parts.append(f"\n... [内容已截断，共 {total} {unit}]")
+            else:
+                parts.append(result_text)
         else:
-            message += "结果: 无内容"
+            parts.append("结果: 无内容")
         
         # 如果是交互工具，添加用户输入
         if tool_name == "interact" and "user_input" in result:
-            message += f"\n用户输入: {result['user_input']}"
+            parts.append(f"\n用户输入: {result['user_input']}")
         
-        self.add_user_message(message)
-        self._trim_history()
+        self.add_user_message("".join(parts))
     
     def _trim_history(self) -> None:
         """修剪对话历史以保持在令牌限制内"""
-        # 保留system消息
-        system_message = None
-        for msg in self.messages:
-            if msg["role"] == "system":
-                system_message = msg
-                break
-        
-        # 估算当前对话历史的令牌数量
-        total_tokens = sum(len(str(msg.get("content", ""))) for msg in self.messages) // 4  # 粗略估计
-        
-        # 如果超过最大令牌数，删除最早的消息，但保留系统消息
-        while total_tokens > self.max_tokens and len(self.messages) > 2:  # 保留至少system和最新user
-            # 找到第一个非系统消息删除
-            for i, msg in enumerate(self.messages):
-                if msg["role"] != "system":
-                    self.messages.pop(i)
-                    # 重新计算令牌数
-                    total_tokens = sum(len(str(msg.get("content", ""))) for msg in self.messages) // 4
-                    break
+        # 如果超过最大令牌数，删除最早的消息；系统消息单独保存，不会被删除
+        while self._total_tokens > self.max_tokens and len(self.messages) > 1:  # 保留至少最新一条消息
+            self.messages.popleft()
+            self._total_tokens -= self._message_tokens.popleft()
     
     def get_messages(self) -> List[Dict]:
-        """获取当前对话历史"""
-        return self.messages
+        """获取当前对话历史（系统消息在最前）"""
+        if self.system_message is None:
+            return list(self.messages)
+        return [self.system_message, *self.messages]
     
     def was_last_tool_info(self) -> bool:
         """检查上一个使用的工具是否为info工具"""
         return self.last_tool_was_info
 
 
+# 解析模型响应用到的正则，在模块加载时编译一次
+_JSON_BLOCK_RE = re.compile(r'```(?:json|python)?\s*([\s\S]*?)```')
+_TOOL_CALL_RE = re.compile(r'([a-zA-Z_]+)\s*\(([\s\S]*?)\)')
+_ARG_RE = re.compile(r'([a-zA-Z_]+)\s*=\s*(?:"([^"]*?)"|\'([^\']*?)\'|([^,\s]+))')
+_PARAM_RE = re.compile(r'([a-zA-Z_]+)\s*[:：]\s*[\'"]([^\'"]+)[\'"]')
+_FILE_PATH_RE = re.compile(r'[\'"]([^\'"]+)[\'"]|文件\s*[:：]?\s*([^\s,]+)|路径\s*[:：]?\s*([^\s,]+)')
+# _FILE_PATH_RE的每个分支都以其中之一开头
+_FILE_PATH_MARKERS = ("'", '"', "文件", "路径")
+# 退出意图关键词（纯字面量，小写后逐个子串查找比正则交替更快）
+_EXIT_KEYWORDS = ('退出', '结束', '完成', 'exit', 'quit')
+
+# 代码块JSON解码器: strict=False允许字符串值中出现未转义的换行等控制字符（模型常直接输出多行内容）
+_JSON_BLOCK_DECODER = json.JSONDecoder(strict=False)
+
+
+def _load_json_block(json_pattern: re.Match) -> Any:
+    """解析_JSON_BLOCK_RE匹配到的代码块中的第一个JSON对象，解析失败时抛出json.JSONDecodeError
+    
+    从每个"{"处尝试raw_decode，一次扫描即可跳过对象前后的说明文字，无需预先处理文本。
+    """
+    json_text = json_pattern.group(1)
+    start = json_text.find('{')
+    if start == -1:
+        raise json.JSONDecodeError("代码块中没有JSON对象", json_text, 0)
+    
+    while True:
+        try:
+            return _JSON_BLOCK_DECODER.raw_decode(json_text, start)[0]
+        except json.JSONDecodeError:
+            start = json_text.find('{', start + 1)
+            if start == -1:
+                raise
+
+
+def _has_complete_tool_block(content: str) -> bool:
+    """检查内容中是否已有一个完整且可解析的工具调用JSON代码块"""
+    json_pattern = _JSON_BLOCK_RE.search(content)
+    if not json_pattern:
+        return False
+    try:
+        tool_json = _load_json_block(json_pattern)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(tool_json, dict) and "name" in tool_json and "args" in tool_json
+
+
+@functools.lru_cache(maxsize=8)
+def _build_tool_matcher(tools: Tuple[str, ...]) -> Tuple[re.Pattern, Dict[str, Tuple[str, ...]], Dict[str, int]]:
+    """构建一次扫描即可找出所有工具名出现位置的组合正则
+    
+    Returns:
+        (组合正则, 小写工具名 -> 同一位置上同时出现的工具名(自身及作为其前缀的工具名), 工具名 -> 优先级)
+        组合正则用零宽前瞻在每个位置上尝试匹配，较长的工具名排在前面；较短的前缀工具名通过映射补全，
+        因此能找到每个工具名的每一处出现。优先级即工具在列表中的位置，越靠前越优先。
+    """
+    alternation = "|".join(re.escape(name) for name in sorted(tools, key=len, reverse=True))
+    names_at_match: Dict[str, Tuple[str, ...]] = {}
+    for name in tools:
+        lowered = name.lower()
+        names_at_match[lowered] = tuple(t for t in tools if lowered.startswith(t.lower()))
+    priority: Dict[str, int] = {}
+    for index, name in enumerate(tools):
+        priority.setdefault(name, index)
+    return re.compile(rf'(?=({alternation}))', re.IGNORECASE), names_at_match, priority
+
+
+# 工具名之后的参数部分（到行尾）
+_TOOL_REST_RE = re.compile(r'\s*[:：]?\s*(.*)')
+
+
+def _is_timeout_error(error: Exception) -> bool:
+    """判断requests抛出的ConnectionError是否实际由超时引起
+    
+    挂载urllib3 Retry后，读取超时在重试用尽时被包装为MaxRetryError，再由requests转换为
+    ConnectionError；流式读取过程中的读取超时同样以ConnectionError抛出。
+    """
+    from urllib3.exceptions import NewConnectionError, TimeoutError as Urllib3TimeoutError
+    
+    cause = error.args[0] if error.args else None
+    cause = getattr(cause, "reason", cause)  # MaxRetryError.reason为最后一次失败的原因
+    # NewConnectionError(连接被拒绝等)在urllib3中继承自ConnectTimeoutError，但并非超时
+    return isinstance(cause, Urllib3TimeoutError) and not isinstance(cause, NewConnectionError)
+
+
 class ModelCommunicator:
     """模型通信器：处理与AI模型的通信，使用HTTP请求"""
     
+    # 每个会话一个实例，使用__slots__省去实例__dict__
+    __slots__ = ('base_url', 'api_key', 'model_name', 'max_retries', 'retry_delay', 'timeout',
+                 'stream', '_session')
+    
     def __init__(self, config: Dict):
         self.base_url = config.get("base_url", "https://api.openai.com/v1")
         self.api_key = config.get("api_key", "")
@@ -305,9 +635,58 @@ class ModelCommunicator:
         self.max_retries = config.get("max_retries", 3)
         self.retry_delay = config.get("retry_delay", 5)
         self.timeout = config.get("timeout", 90)
+        self.stream = config.get("stream", False)  # 是否使用SSE流式接收模型输出
+        self._session = None  # 复用的HTTP会话，首次发送请求时创建
+    
+    def _get_session(self):
+        """获取复用的HTTP会话，保持与模型服务的长连接，避免每次请求重新握手
+        
+        超时、连接错误、限流(429)和5xx等临时性错误响应由挂载在会话上的urllib3 Retry
+        按带随机抖动的指数退避自动重试；响应带有Retry-After头时按其指定的时间等待。
+        """
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            
+            retry_kwargs = {
+                "total": self.max_retries,
+                "backoff_factor": self.retry_delay / 2,  # 退避间隔约为 retry_delay × 2^(n-2)
+                "backoff_max": 60,
+                "status_forcelist": (408, 425, 429, 500, 502, 503, 504),
+                "allowed_methods": frozenset(["POST"]),
+                "respect_retry_after_header": True,  # 429/503响应的Retry-After优先于计算出的退避间隔
+                "raise_on_status": False  # 重试用尽后返回最后一次响应，由send_request处理错误状态码
+            }
+            try:
+                # 随机抖动避免多个会话在同一时刻集中重试
+                retry = Retry(**retry_kwargs, backoff_jitter=self.retry_delay / 2)
+            except TypeError:
+                # urllib3 1.x 不支持backoff_jitter
+                retry = Retry(**retry_kwargs)
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.api_key}"
+            })
+            self._session = session
+        return self._session
+    
+    def close(self) -> None:
+        """关闭复用的HTTP会话，释放连接池中的连接（之后再发送请求会重新创建会话）"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
     
     def send_request(self, messages: List[Dict]) -> Dict:
-        """向模型发送请求，自动重试
+        """向模型发送请求
+        
+        超时、连接错误和临时性错误状态码由会话的连接池层自动重试；状态码为200但响应体
+        不是有效JSON的情况连接池层无法识别，在此按retry_delay间隔重试。
         
         Args:
             messages: 消息历史
@@ -315,105 +694,119 @@ class ModelCommunicator:
         Returns:
             模型响应
         """
-        retries = 0
+        # 延迟导入: requests会连带加载urllib3/ssl等大量模块，仅在真正发送请求时才需要
+        import requests
         
-        # 准备请求头和请求体
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        session = self._get_session()
         
+        # 准备请求体
         data = {
             "model": self.model_name,
             "messages": messages,
-            "stream": False  # 禁用流式输出
+            "stream": self.stream
         }
         
-        while retries <= self.max_retries:
+        body = _json_dumpb(data)
+        retries = 0
+        
+        while True:
+            print({"type": "system", "timestamp": time.time(), "content": {"message": "向模型发送请求", "retry": retries, "max_retries": self.max_retries}}, flush=True)
+            
             try:
-                print({"type": "system", "timestamp": time.time(), "content": {"message": "向模型发送请求", "retry": retries, "max_retries": self.max_retries}}, flush=True)
-                
-                # 使用requests发送请求
-                response = requests.post(
+                # 通过复用的会话发送请求
+                response = session.post(
                     f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=self.timeout
+                    data=body,
+                    timeout=self.timeout,
+                    stream=self.stream
                 )
                 
                 # 检查响应状态码
-                if response.status_code == 200:
-                    # 检查内容是否为JSON
-                    try:
-                        return response.json()
-                    except json.JSONDecodeError as e:
-                        print({"type": "error", "timestamp": time.time(), "content": {"message": f"JSON解析失败: {str(e)}"}}, flush=True)
-                        # 如果不是有效的JSON，我们可以尝试重试
-                        retries += 1
-                        if retries <= self.max_retries:
-                            print(f"响应不是有效的JSON，将在{self.retry_delay}秒后重试...", flush=True)
-                            time.sleep(self.retry_delay)
-                            continue
-                        else:
-                            return {"error": f"服务器返回了无效的JSON响应: {response.text[:200]}..."}
-                else:
-                    # 某些错误可能需要重试
-                    if 500 <= response.status_code < 600:  # 服务器错误
-                        retries += 1
-                        if retries <= self.max_retries:
-                            print(f"API请求返回错误状态码: {response.status_code}，将在{self.retry_delay}秒后重试...", flush=True)
-                            time.sleep(self.retry_delay)
-                            continue
-                    
-                    # 其他错误直接返回，不重试
-                    print(f"API请求失败: {response.status_code}", flush=True)
-                    error_text = response.text
+                if response.status_code != 200:
+                    # OpenAI兼容接口的响应体均为UTF-8，直接解码原始字节，跳过requests的编码探测
+                    raw_body = response.content
+                    error_text = raw_body.decode('utf-8', errors='replace')
                     try:
-                        error_json = response.json()
+                        error_json = _json_loads(raw_body)
                         error_text = json.dumps(error_json, ensure_ascii=False)
                     except:
                         pass
-                    print(error_text, flush=True)
+                    # 状态码与错误详情合并为一次输出，只获取一次stdout锁、刷新一次
+                    print(f"API请求失败: {response.status_code}\n{error_text}", flush=True)
                     return {"error": f"API请求失败: {response.status_code}", "details": error_text}
-                    
-            except requests.exceptions.Timeout:
-                # 超时错误，尝试重试
+                
+                # 检查内容是否为JSON
+                if self.stream:
+                    return self._read_stream(response)
+                return _json_loads(response.content)
+            
+            except json.JSONDecodeError as e:
+                print({"type": "error", "timestamp": time.time(), "content": {"message": f"JSON解析失败: {str(e)}"}}, flush=True)
+                # 如果不是有效的JSON，我们可以尝试重试
                 retries += 1
                 if retries <= self.max_retries:
-                    print(f"API请求超时，将在{self.retry_delay}秒后重试 ({retries}/{self.max_retries})...", flush=True)
+                    print(f"响应不是有效的JSON，将在{self.retry_delay}秒后重试...", flush=True)
                     time.sleep(self.retry_delay)
-                else:
+                    continue
+                return {"error": f"服务器返回了无效的JSON响应: {e.doc[:200]}..."}
+            
+            except requests.exceptions.Timeout:
+                print(f"API请求在{self.max_retries}次重试后仍然超时", flush=True)
+                return {"error": "API请求多次超时，请检查网络连接或稍后再试"}
+            
+            except requests.exceptions.ConnectionError as e:
+                if _is_timeout_error(e):
                     print(f"API请求在{self.max_retries}次重试后仍然超时", flush=True)
                     return {"error": "API请求多次超时，请检查网络连接或稍后再试"}
+                print(f"API连接在{self.max_retries}次重试后仍然失败", flush=True)
+                return {"error": "API连接多次失败，请检查网络连接或API服务是否可用"}
             
-            except requests.exceptions.ConnectionError:
-                # 连接错误，尝试重试
-                retries += 1
-                if retries <= self.max_retries:
-                    print(f"API连接错误，将在{self.retry_delay}秒后重试 ({retries}/{self.max_retries})...", flush=True)
-                    time.sleep(self.retry_delay)
-                else:
-                    print(f"API连接在{self.max_retries}次重试后仍然失败", flush=True)
-                    return {"error": "API连接多次失败，请检查网络连接或API服务是否可用"}
-                
             except Exception as e:
                 # 其他异常
                 print(f"API请求异常: {e}", flush=True)
-                retries += 1
-                if retries <= self.max_retries:
-                    print(f"将在{self.retry_delay}秒后重试 ({retries}/{self.max_retries})...", flush=True)
-                    time.sleep(self.retry_delay)
-                else:
-                    return {"error": f"API请求异常: {str(e)}"}
+                return {"error": f"API请求异常: {str(e)}"}
+    
+    def _read_stream(self, response) -> Dict:
+        """逐行读取SSE流式响应，将增量内容拼接为与非流式响应相同的结构
         
-        return {"error": f"API请求在{self.max_retries}次重试后失败"}
+        一旦收到完整的工具调用JSON代码块就停止读取并关闭连接，不再等待模型生成后续内容。
+        
+        Args:
+            response: 以stream=True发送的请求的响应
+            
+        Returns:
+            模型响应
+        """
+        parts: List[str] = []
+        with response:
+            for line in response.iter_lines():
+                # 跳过事件间的空行和注释/非数据行
+                if not line.startswith(b"data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == b"[DONE]":
+                    break
+                
+                chunk = _json_loads(payload)
+                if "error" in chunk:
+                    return {"error": chunk["error"]}
+                
+                choices = chunk.get("choices") or [{}]
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    parts.append(content)
+                    # 只有新增内容可能闭合代码块时才检查
+                    if "`" in content and _has_complete_tool_block("".join(parts)):
+                        break
+        
+        return {"choices": [{"message": {"role": "assistant", "content": "".join(parts)}}]}
     
-    def parse_response(self, response: Dict, available_tools: List[str]) -> Union[Dict, str]:
+    def parse_response(self, response: Dict, available_tools: Tuple[str, ...]) -> Union[Dict, str]:
         """解析模型响应
         
         Args:
             response: 模型响应
-            available_tools: 可用工具列表
+            available_tools: 可用工具名元组
             
         Returns:
             工具调用信息或EOF标记
@@ -434,28 +827,20 @@ class ModelCommunicator:
                 return {"type": "error", "message": "模型响应内容为空"}
             
             # 检查是否包含EOF标记（如果EOF单独出现或在最后）
-            if content.strip() == "EOF" or content.strip().endswith("EOF"):
+            # 只检查末尾一小段，避免每轮都复制整段内容；末尾空白过长时才回退到完整rstrip
+            tail = content[-16:].rstrip()
+            if len(tail) < 3 and len(content) > 16:
+                tail = content.rstrip()
+            if tail.endswith("EOF"):
                 return "EOF"
             
             # 1. 首先尝试查找JSON代码块
-            json_pattern = re.search(r'```(?:json|python)?\s*([\s\S]*?)```', content)
+            # 先用廉价的子串检查排除不含代码块的响应，再运行正则
+            json_pattern = _JSON_BLOCK_RE.search(content) if "```" in content else None
             if json_pattern:
                 try:
-                    # 提取JSON块内容
-                    json_text = json_pattern.group(1).strip()
-                    
-                    # 处理多行JSON文本
-                    lines = [line.strip() for line in json_text.split('\n')]
-                    lines = [line for line in lines if line]
-                    json_text = ' '.join(lines)
-                    
-                    # 查找包含{...}的部分
-                    json_obj_match = re.search(r'({[\s\S]*})', json_text)
-                    if json_obj_match:
-                        json_text = json_obj_match.group(1)
-                    
-                    # 尝试解析JSON
-                    tool_json = json.loads(json_text)
+                    # 提取并解析JSON块内容
+                    tool_json = _load_json_block(json_pattern)
                     
                     # 检查是否是标准工具调用格式
                     if "name" in tool_json and "args" in tool_json:
@@ -468,86 +853,93 @@ class ModelCommunicator:
             # 2. 如果没有找到标准格式的JSON工具调用，尝试解析其他格式
             
             # 2.1 查找类似 tool_name(arg1="value", arg2="value") 的模式
-            tool_call_match = re.search(r'([a-zA-Z_]+)\s*\(([\s\S]*?)\)', content)
+            tool_call_match = _TOOL_CALL_RE.search(content) if "(" in content else None
             if tool_call_match:
                 tool_name = tool_call_match.group(1).strip()
                 args_text = tool_call_match.group(2).strip()
                 
                 if tool_name in available_tools:
                     # 解析参数
-                    args = {}
-                    for arg_match in re.finditer(r'([a-zA-Z_]+)\s*=\s*(?:"([^"]*?)"|\'([^\']*?)\'|([^,\s]+))', args_text):
-                        arg_name = arg_match.group(1)
-                        # 找到第一个非None的组
-                        arg_value = next((g for g in arg_match.groups()[1:] if g is not None), "")
-                        args[arg_name] = arg_value
+                    # findall直接返回(参数名, 双引号值, 单引号值, 裸值)元组，未匹配的组为空字符串
+                    args = {name: dq or sq or bare for name, dq, sq, bare in _ARG_RE.findall(args_text)}
                     
                     return {
                         "name": tool_name,
                         "args": args
                     }
             
-            # 2.2 查找显式提到工具名及其参数的模式
-            for tool_name in available_tools:
-                tool_match = re.search(rf'{tool_name}\s*[:：]?\s*(.*)', content, re.IGNORECASE)
-                if tool_match:
-                    # 找到工具名，解析参数
-                    rest_of_content = tool_match.group(1).strip()
-                    
-                    # 如果是exit工具，简单处理
-                    if tool_name == "exit":
-                        return {
-                            "name": "exit",
-                            "args": {"message": rest_of_content or "任务已完成"}
-                        }
-                    
-                    # 尝试从内容中提取参数
-                    args = {}
-                    
-                    # 查找引号括起来的参数
-                    param_matches = re.finditer(r'([a-zA-Z_]+)\s*[:：]\s*[\'"]([^\'"]+)[\'"]', rest_of_content)
-                    for param_match in param_matches:
-                        param_name = param_match.group(1)
-                        param_value = param_match.group(2)
-                        args[param_name] = param_value
-                    
-                    # 如果没有找到参数，使用整个内容
-                    if not args:
-                        # 查找文件路径参数（针对read/write工具）
-                        if tool_name in ["read", "write"]:
-                            file_path_match = re.search(r'[\'"]([^\'"]+)[\'"]|文件\s*[:：]?\s*([^\s,]+)|路径\s*[:：]?\s*([^\s,]+)', rest_of_content)
-                            if file_path_match:
-                                # 选择第一个非None的组作为文件路径
-                                file_path = next((g for g in file_path_match.groups() if g), "")
-                                args["file_path"] = file_path
-                        
-                        # 针对命令工具，整个内容可能就是命令
-                        if tool_name == "execute" and not args:
-                            args["command"] = rest_of_content
-                        
-                        # 针对info和interact工具，整个内容可能就是内容
-                        if tool_name in ["info", "interact"] and not args:
-                            args["content"] = rest_of_content
-                    
+            # 2.2 查找显式提到工具名及其参数的模式（所有工具名合并为一个正则，只扫描一次）
+            # 与逐个工具查找的结果一致: 选择列表中最靠前的、在内容中出现过的工具，取其第一次出现的位置
+            best = None  # (优先级, 出现位置, 工具名)
+            if available_tools:
+                tool_regex, names_at_match, priority = _build_tool_matcher(available_tools)
+                for name_match in tool_regex.finditer(content):
+                    for name in names_at_match[name_match.group(1).lower()]:
+                        if best is None or priority[name] < best[0]:
+                            best = (priority[name], name_match.start(), name)
+                    if best[0] == 0:
+                        break
+            if best is not None:
+                _, position, tool_name = best
+                # 找到工具名，解析参数
+                rest_of_content = _TOOL_REST_RE.match(content, position + len(tool_name)).group(1).strip()
+                
+                # 如果是exit工具，简单处理
+                if tool_name == "exit":
                     return {
-                        "name": tool_name,
-                        "args": args
+                        "name": "exit",
+                        "args": {"message": rest_of_content or "任务已完成"}
                     }
+                
+                # 尝试从内容中提取参数
+                args = {}
+                
+                # 查找引号括起来的参数（先用廉价的子串检查排除不含冒号的内容）
+                if ":" in rest_of_content or "：" in rest_of_content:
+                    for param_match in _PARAM_RE.finditer(rest_of_content):
+                        args[param_match.group(1)] = param_match.group(2)
+                
+                # 如果没有找到参数，使用整个内容
+                if not args:
+                    # 查找文件路径参数（针对read/write工具）
+                    # 只有含引号或"文件"/"路径"标签时才可能匹配，其余情况跳过正则
+                    if tool_name in ["read", "write"] and any(
+                            marker in rest_of_content for marker in _FILE_PATH_MARKERS):
+                        file_path_match = _FILE_PATH_RE.search(rest_of_content)
+                        if file_path_match:
+                            # 选择第一个非None的组作为文件路径
+                            file_path = next((g for g in file_path_match.groups() if g), "")
+                            args["file_path"] = file_path
+                    
+                    # 针对命令工具，整个内容可能就是命令
+                    if tool_name == "execute" and not args:
+                        args["command"] = rest_of_content
+                    
+                    # 针对info和interact工具，整个内容可能就是内容
+                    if tool_name in ["info", "interact"] and not args:
+                        args["content"] = rest_of_content
+                
+                return {
+                    "name": tool_name,
+                    "args": args
+                }
             
             # 3. 最后，尝试根据内容猜测最可能的工具
+            stripped = content.strip()
             
             # 3.1 内容包含"退出"、"结束"等关键词
-            if re.search(r'退出|结束|完成|exit|quit', content, re.IGNORECASE):
+            content_lower = content.lower()
+            if any(keyword in content_lower for keyword in _EXIT_KEYWORDS):
                 return {
                     "name": "exit",
-                    "args": {"message": content.strip() or "任务已完成"}
+                    "args": {"message": stripped or "任务已完成"}
                 }
             
-            # 3.2 内容看起来像是提供信息
-            if len(content.strip().split()) > 3 and "info" in available_tools:
+            # 3.2 内容看起来像是提供信息（超过3个词；最多切分4次，不必切分整段内容）
+            if len(stripped.split(None, 4)) > 3 and "info" in available_tools:
                 return {
                     "name": "info",
-                    "args": {"content": content.strip()}
+                    "args": {"content": stripped}
                 }
             
             # 如果无法识别为任何工具调用，返回错误
@@ -555,23 +947,32 @@ class ModelCommunicator:
             return {"type": "error", "message": "无法解析响应为工具调用", "content": content}
             
         except Exception as e:
-            print(f"解析模型响应异常: {e}", flush=True)
-            print(f"异常详情: {str(e)}", flush=True)
+            print(f"解析模型响应异常: {e}\n异常详情: {str(e)}", flush=True)
             return {"type": "error", "message": f"解析响应异常: {str(e)}"}
 
 
 class AIAgent:
     """AI Agent主类：协调所有组件工作"""
     
+    # 每个会话一个实例，使用__slots__省去实例__dict__
+    __slots__ = ('config_manager', 'config', 'tool_manager', 'dialogue_manager', 'model_communicator',
+                 'max_content_size', 'command_timeout', 'pending_interactions')
+    
     def __init__(self):
         self.config_manager = ConfigManager()
         self.config = self.config_manager.get_config()
-        self.tool_manager = ToolManager()
-        self.dialogue_manager = DialogueManager(self.config.get("max_tokens", 16000))
+        self.tool_manager = _get_shared_tool_manager()
+        self.dialogue_manager = DialogueManager(
+            self.config.get("max_tokens", 16000),
+            self.config.get("model_name", "gpt-4o"),
+            self.config.get("use_tiktoken", False)
+        )
         self.model_communicator = ModelCommunicator(self.config)
         
         # 添加大文件处理的配置
         self.max_content_size = self.config.get("max_content_size", 10 * 1024)  # 默认10KB
+        # 命令执行的最长时间（秒），防止失控的命令一直占用会话
+        self.command_timeout = self.config.get("command_timeout", 300)
         
         # 挂起的交互请求
         self.pending_interactions = {}
@@ -583,81 +984,20 @@ class AIAgent:
     def get_system_prompt(self) -> str:
         """获取系统提示词"""
         try:
+            # 延迟导入: psutil只在构建系统提示词时使用
+            import psutil
+            
+            # 内存信息会变化，每次重新读取（只调用一次virtual_memory）
+            memory = psutil.virtual_memory()
             system_info = {
-                "os": platform.system(),
-                "os_version": platform.version(),
-                "python_version": sys.version,
-                "cpu_cores": psutil.cpu_count(logical=True),
-                "memory_total_gb": round(psutil.virtual_memory().total / (1024**3), 2),
-                "memory_available_gb": round(psutil.virtual_memory().available / (1024**3), 2),
+                **_get_static_sysinfo(),
+                "memory_total_gb": round(memory.total / (1024**3), 2),
+                "memory_available_gb": round(memory.available / (1024**3), 2),
                 "current_directory": os.getcwd()
             }
             
-            # 获取所有可用工具的描述
-            tool_descriptions = self.tool_manager.get_tool_descriptions()
-            
-            # 构建工具使用指南
-            tools_info = "你将作为Axiom Agent为用户服务!\n\n【工具使用指南】\n你有以下工具可用，请按需选择最合适的工具:\n\n"
-            
-            for tool_name, description in tool_descriptions.items():
-                tools_info += f"{tool_name}: {description}\n"
-                
-                # 添加工具调用格式示例
-                tools_info += "调用格式: \n```json\n"  
-                tools_info += f'{{\n  "name": "{tool_name}",\n  "args": {{\n'  
-                
-                # 读取tools.json获取参数信息  
-                try:  
-                    with open("tools.json", 'r', encoding='utf-8') as f:  
-                        tool_defs = json.load(f)  
-                    
-                    args = tool_defs.get(tool_name, {}).get("args", {})  
-                    for arg_name, arg_desc in args.items():  
-                        tools_info += f'    "{arg_name}": "参数值" // {arg_desc}\n'  
-                except:  
-                    # 如果无法读取tools.json，使用通用格式  
-                    if tool_name == "exit":  
-                        tools_info += '    "message": "可选的结束消息"\n'  
-                    else:  
-                        tools_info += '    "...": "查看tools.json获取此工具的参数"\n'  
-                
-                tools_info += "  }\n}\n```\n\n"
-            
-            tools_info += """
-【API工作模式】
-- 我作为API服务运行，不再有命令行交互界面
-- 每个用户请求和响应作为独立的API调用处理
-- 用户交互使用异步模式，需要用户在下一次请求中提供输入
-
-【任务执行流程】
-1. 收到新任务时，首先分析任务性质:
-   - 如果是复杂任务：先用info工具提供整体计划
-   - 如果是简单任务：直接使用相应工具执行
-
-2. 使用info工具后:
-   - 必须立即使用其他工具执行实际操作
-   - 不要连续使用info工具
-
-3. 执行步骤:
-   - 使用适当的工具执行具体操作
-   - 使用info工具提供阶段性进展
-   - 使用interact工具在需要用户输入时与用户交互
-   - 使用exit工具结束任务
-
-4. 安全考虑:
-   - 执行危险命令时系统会自动要求用户确认
-   - 确保解释清楚命令的目的和可能的影响
-   - 在执行修改系统状态的命令前先做好检查和备份
-
-【注意事项】
-- 如果你想要展示消息并获得用户的回复，请务必使用interact工具而非info工具
-- 避免重复使用info工具，提供信息后立即执行
-- 每次只返回一个工具调用，不要添加额外说明
-- 大文件内容会自动截断，请提取关键信息处理
-- 保持回答简洁，聚焦于任务目标
-- 交互工具(interact)现在会暂停执行流程，等待下一次用户消息
-- 任务完成时务必使用exit工具结束任务
-"""
+            # 工具使用指南不随会话变化，直接复用已构建的文本
+            tools_info = _build_tools_guide(self.tool_manager)
             
             return f"系统信息: {json.dumps(system_info, ensure_ascii=False)}\n{tools_info}"
         except Exception as e:
@@ -689,7 +1029,7 @@ class AIAgent:
             }
         
         # 获取可用工具列表
-        available_tools = list(self.tool_manager.get_tool_descriptions().keys())
+        available_tools = self.tool_manager.get_tool_names()
         
         # 解析响应
         parsed_response = self.model_communicator.parse_response(response, available_tools)
@@ -753,7 +1093,8 @@ class AIAgent:
         # 特殊处理interact工具
         if tool_name == "interact":
             # 创建交互请求
-            interaction_id = str(uuid.uuid4())
+            # 驻留交互ID，作为字典键反复比较时可直接按指针判等
+            interaction_id = sys.intern(uuid.uuid4().hex)
             content = tool_args.get("content", "请输入您的回复")
             prompt = tool_args.get("prompt", "请输入您的回复: ")
             
@@ -772,6 +1113,13 @@ class AIAgent:
                 "prompt": prompt
             }
         
+        # 读取文件时在读取阶段就按max_content_size截断，避免把整个大文件读入内存；
+        # 通过tools.json替换的同名工具不一定接受这些参数，只在工具函数接受时才传入
+        if tool_name == "read" and self.tool_manager.accepts_argument(tool_name, "max_bytes"):
+            tool_args = {**tool_args, "max_bytes": self.max_content_size}
+        elif tool_name == "execute" and self.tool_manager.accepts_argument(tool_name, "timeout"):
+            tool_args = {**tool_args, "timeout": self.command_timeout}
+        
         # 调用工具函数并传递参数
         result = tool_function(**tool_args)
         
@@ -827,4 +1175,8 @@ class AIAgent:
         self.dialogue_manager.add_tool_result(tool_call, result)
         
         # 构造继续执行的消息
-        return self.process_message("继续执行任务")
\ No newline at end of file
+        return self.process_message("继续执行任务")
+    
+    def close(self) -> None:
+        """释放会话持有的网络资源（删除会话时调用）"""
+        self.model_communicator.close()
\ No newline at end of file
@@ -1,22 +1,90 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 import uuid
 import os
+import re
+import sys
 import json
 import time
+import threading
+from dataclasses import dataclass, field
 from agent import AIAgent
 from flask_cors import CORS
+from cachetools import TTLCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """使用orjson编解码请求和响应JSON的提供器（orjson可选，未安装时使用Flask默认实现）"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # 直接输出orjson编码的字节，省去解码再编码的开销
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
+
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 CORS(app)
 
-# 会话存储
-sessions = {}
+# 会话的过期时间(秒)，每次访问会话时重新计时
+SESSION_TTL = 3600
+
+# 交互请求的过期时间(秒)
+INTERACTION_TTL = 1800
+
+# 每类存储最多保留的条目数，超出时淘汰最久未使用的条目
+MAX_ENTRIES = 10000
+
+
+@dataclass
+class SessionState:
+    """单个会话的全部状态，一次查找即可取得"""
+    agent: AIAgent
+    continuation: bool = False  # 此会话的"继续"标志
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)  # 串行化同一会话的请求
+
+
+# 会话存储: 会话ID -> SessionState
+sessions = TTLCache(maxsize=MAX_ENTRIES, ttl=SESSION_TTL)
 
 # 交互等待状态
-interaction_requests = {}
+interaction_requests = TTLCache(maxsize=MAX_ENTRIES, ttl=INTERACTION_TTL)
+
+# 健康检查的响应体，在导入时编码一次
+_STATUS_BODY = b'{"status":"ok"}'
+
+# 固定内容的错误响应体，在导入时编码一次
+_ERR_EMPTY_BODY = app.json.dumps({"error": "请求体不能为空"}).encode('utf-8')
+_ERR_EMPTY_MESSAGE = app.json.dumps({"error": "消息不能为空"}).encode('utf-8')
+_ERR_SESSION_NOT_FOUND = app.json.dumps({"error": "会话不存在"}).encode('utf-8')
 
-# 每个会话的"继续"标志
-continuation_flags = {}
+# 合法的会话/交互ID格式（32位十六进制UUID，兼容带连字符的旧格式），只有符合格式的客户端ID才会被驻留
+_ID_RE = re.compile(r'[0-9a-fA-F]{32}|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}')
+
+# TTLCache不是线程安全的，所有读写都需持有此锁（不要在持锁期间调用agent）
+_store_lock = threading.RLock()
+
+def _json_response(body, status):
+    """用预先编码的JSON响应体构建响应（响应对象会被after_request钩子修改，每次新建）"""
+    return app.response_class(body, status=status, mimetype='application/json')
+
+def _intern_id(value):
+    """驻留格式合法的ID字符串，使其作为字典键时可按指针快速判等；其他值原样返回"""
+    if isinstance(value, str) and _ID_RE.fullmatch(value):
+        return sys.intern(value)
+    return value
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -24,123 +92,140 @@ def chat():
     处理用户消息的API端点 - 每次只执行一个工具，但支持前端"继续"请求
     """
     try:
-        data = request.json
+        # 请求体只解析一次，不缓存解析结果
+        data = request.get_json(cache=False)
         
         if not data:
-            return jsonify({"error": "请求体不能为空"}), 400
-            
-        # 获取会话ID (如果没有则创建新会话)
-        session_id = data.get('session_id')
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            sessions[session_id] = AIAgent()
-            continuation_flags[session_id] = False
+            return _json_response(_ERR_EMPTY_BODY, 400)
             
-        # 获取用户消息
+        # 一次性取出所有请求字段: 会话ID、用户消息、是否为"继续"请求、响应的交互ID
+        session_id = _intern_id(data.get('session_id'))
         message = data.get('message')
+        continue_execution = data.get('continue', False)
+        interaction_id = _intern_id(data.get('interaction_id'))
+        
+        # 先校验消息，无效请求不会创建会话
         if not message:
-            return jsonify({"error": "消息不能为空"}), 400
+            return _json_response(_ERR_EMPTY_MESSAGE, 400)
         
-        # 检查是否是"继续"请求
-        continue_execution = data.get('continue', False)
+        # 获取会话ID (如果没有则创建新会话)
+        state = None
+        if not session_id:
+            session_id = sys.intern(uuid.uuid4().hex)
+            state = SessionState(AIAgent())
             
-        # 检查会话是否存在
-        if session_id not in sessions:
-            sessions[session_id] = AIAgent()
-            continuation_flags[session_id] = False
+        # 检查会话是否存在（新建的会话无需再查找）
+        if state is None:
+            with _store_lock:
+                state = sessions.get(session_id)
+            if state is None:
+                new_state = SessionState(AIAgent())
+                with _store_lock:
+                    # 并发请求可能已为同一会话ID创建了状态，以先写入者为准
+                    state = sessions.setdefault(session_id, new_state)
+        with _store_lock:
+            # 写入新会话，或重新写入已有会话以刷新其过期时间
+            sessions[session_id] = state
             
-        agent = sessions[session_id]
+        agent = state.agent
         
-        # 处理互动完成的情况
-        interaction_id = data.get('interaction_id')
-        if interaction_id and interaction_id in interaction_requests:
-            # 用户正在响应交互请求
-            user_input = message
-            interaction_requests[interaction_id]['user_input'] = user_input
-            interaction_requests[interaction_id]['completed'] = True
+        # 同一会话的请求串行处理，避免并发请求交错修改对话历史和继续标志
+        with state.lock:
+            # 处理互动完成的情况
+            with _store_lock:
+                pending_interaction = interaction_requests.get(interaction_id) if interaction_id else None
+                if pending_interaction is not None:
+                    # 用户正在响应交互请求
+                    pending_interaction['user_input'] = message
+                    pending_interaction['completed'] = True
+            if pending_interaction is not None:
+                user_input = message
+                
+                # 完成交互流程并继续处理
+                result = agent.complete_interaction(interaction_id, user_input)
+                # 设置此会话有后续操作
+                state.continuation = True
+                
+                # 添加会话ID和继续标志到响应
+                result['session_id'] = session_id
+                result['has_continuation'] = True
+                return jsonify(result)
+            
+            # 如果是继续执行请求，使用特殊消息
+            if continue_execution and state.continuation:
+                # 这是前端请求继续执行的情况
+                message = "继续执行任务"
+                # 重置继续标志
+                state.continuation = False
+            else:
+                # 新消息，重置继续标志
+                state.continuation = False
             
-            # 完成交互流程并继续处理
-            result = agent.complete_interaction(interaction_id, user_input)
-            # 设置此会话有后续操作
-            continuation_flags[session_id] = True
+            # 正常消息处理 - 只执行一个工具
+            result = agent.process_message(message)
+            
+            # 如果结果是互动请求，保存状态
+            if result.get('type') == 'interaction_required':
+                interaction_id = result.get('interaction_id')
+                with _store_lock:
+                    interaction_requests[interaction_id] = {
+                        'session_id': session_id,
+                        'completed': False,
+                        'created_at': time.time()
+                    }
+                # 设置此会话无后续操作（因为需要用户输入）
+                state.continuation = False
+            else:
+                # 非交互工具，设置继续标志
+                state.continuation = True
             
             # 添加会话ID和继续标志到响应
             result['session_id'] = session_id
-            result['has_continuation'] = True
+            result['has_continuation'] = state.continuation
+            
             return jsonify(result)
-        
-        # 如果是继续执行请求，使用特殊消息
-        if continue_execution and continuation_flags.get(session_id, False):
-            # 这是前端请求继续执行的情况
-            message = "继续执行任务"
-            # 重置继续标志
-            continuation_flags[session_id] = False
-        else:
-            # 新消息，重置继续标志
-            continuation_flags[session_id] = False
-        
-        # 正常消息处理 - 只执行一个工具
-        result = agent.process_message(message)
-        
-        # 如果结果是互动请求，保存状态
-        if result.get('type') == 'interaction_required':
-            interaction_id = result.get('interaction_id')
-            interaction_requests[interaction_id] = {
-                'session_id': session_id,
-                'completed': False,
-                'created_at': time.time()
-            }
-            # 设置此会话无后续操作（因为需要用户输入）
-            continuation_flags[session_id] = False
-        else:
-            # 非交互工具，设置继续标志
-            continuation_flags[session_id] = True
-        
-        # 添加会话ID和继续标志到响应
-        result['session_id'] = session_id
-        result['has_continuation'] = continuation_flags[session_id]
-        
-        return jsonify(result)
     
     except Exception as e:
-        app.logger.error(f"处理请求时发生错误: {str(e)}")
+        app.logger.error("处理请求时发生错误: %s", e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 @app.route("/outputs", methods=["GET"])
 def outputs():
-    return '', 204  # 空响应，状态码204
+    return app.response_class(status=204)  # 空响应，状态码204
 
 @app.route('/api/sessions/<session_id>', methods=['DELETE'])
 def delete_session(session_id):
     """
     删除会话的API端点
     """
-    if session_id in sessions:
-        del sessions[session_id]
-        if session_id in continuation_flags:
-            del continuation_flags[session_id]
+    with _store_lock:
+        state = sessions.pop(session_id, None)
+    if state is not None:
+        # 关闭会话的模型连接，避免连接一直留在连接池中
+        state.agent.close()
         return jsonify({"success": True, "message": f"会话 {session_id} 已删除"})
     else:
-        return jsonify({"error": "会话不存在"}), 404
-
-# 清理过期的交互请求和会话
-@app.before_request
-def cleanup_expired_data():
-    current_time = time.time()
-    # 清理超过30分钟的交互请求
-    expired_interactions = [
-        interaction_id for interaction_id, data in interaction_requests.items()
-        if current_time - data['created_at'] > 1800
-    ]
-    for interaction_id in expired_interactions:
-        del interaction_requests[interaction_id]
+        return _json_response(_ERR_SESSION_NOT_FOUND, 404)
 
 @app.route("/status", methods=["GET"])
 def status():
-    return {"status": "ok"}, 200
+    # 响应对象会被CORS等after_request钩子修改，不能跨请求共享，这里只复用预先编码的响应体
+    return _json_response(_STATUS_BODY, 200)
+
+def warmup():
+    """启动时预热: 提前完成配置读取、工具模块加载和依赖导入，避免由第一个请求承担这些开销"""
+    try:
+        warm_agent = AIAgent()
+        warm_agent.tool_manager.preload_tools()
+        # 模型请求的HTTP依赖在agent中延迟导入，这里提前导入
+        import requests
+    except Exception as e:
+        print(f"启动预热失败，将在首次请求时加载: {e}")
+
+warmup()
 
 if __name__ == '__main__':
     # 确保data目录存在
     os.makedirs('data', exist_ok=True)
-    # 默认开发模式运行
+    # 默认开发模式运行（生产环境使用: gunicorn -c gunicorn.conf.py app:app）
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,16 @@
+# gunicorn生产环境配置: gunicorn -c gunicorn.conf.py app:app
+
+bind = "0.0.0.0:5000"
+
+# 会话保存在进程内存中，多个worker进程之间不共享会话，因此只使用单个worker；
+# 并发由gevent协程提供，等待模型响应的请求不会阻塞其他请求
+workers = 1
+worker_class = "gevent"
+worker_connections = 1000
+
+# 模型请求可能耗时较长（含重试），超时需大于ModelCommunicator的timeout
+timeout = 300
+graceful_timeout = 30
+
+accesslog = "-"
+errorlog = "-"
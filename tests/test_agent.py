@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent
+
+
+class JsonDumpsTest(unittest.TestCase):
+    def test_integer_beyond_64_bits(self):
+        self.assertEqual(json.loads(agent._json_dumps({"a": 2 ** 70})), {"a": 2 ** 70})
+        self.assertEqual(json.loads(agent._json_dumpb({"a": -2 ** 70})), {"a": -2 ** 70})
+
+    def test_tool_result_with_big_integer_argument(self):
+        dialogue = agent.DialogueManager(16000, "gpt-4o")
+        dialogue.add_tool_result({"name": "calc", "args": {"expression": 2 ** 70}},
+                                 {"success": True, "result": "计算结果: 1"})
+        self.assertIn(str(2 ** 70), dialogue.messages[-1]["content"])
+
+
+
+class CustomToolArgumentsTest(unittest.TestCase):
+    """通过tools.json替换的同名工具不接受额外的关键字参数时，调用不应失败"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def _make_agent(self, tool_name, source):
+        tools_dir = self._tmp.name
+        with open(os.path.join(tools_dir, f"{tool_name}.py"), "w", encoding="utf-8") as f:
+            f.write(source)
+        tools_path = os.path.join(tools_dir, "tools.json")
+        with open(tools_path, "w", encoding="utf-8") as f:
+            json.dump({tool_name: {"description": "", "implementation": f"{tool_name}.py"}}, f)
+        ai_agent = agent.AIAgent()
+        ai_agent.tool_manager = agent.ToolManager(tools_path, tools_dir)
+        return ai_agent
+
+    def _call_tool(self, ai_agent, tool_name, args):
+        content = "```json\n" + json.dumps({"name": tool_name, "args": args}) + "\n```"
+        response = {"choices": [{"message": {"role": "assistant", "content": content}}]}
+        with mock.patch.object(agent.ModelCommunicator, "send_request", return_value=response):
+            ai_agent.process_message("go")
+        return ai_agent.dialogue_manager.messages[-1]["content"]
+
+    def test_custom_read_without_max_bytes(self):
+        ai_agent = self._make_agent(
+            "read", "def execute(file_path):\n    return {'success': True, 'result': 'custom ' + file_path}\n")
+        self.assertIn("custom a.txt", self._call_tool(ai_agent, "read", {"file_path": "a.txt"}))
+
+    def test_read_with_max_bytes_still_receives_it(self):
+        ai_agent = self._make_agent(
+            "read", "def execute(file_path, max_bytes=None):\n    return {'success': True, 'result': repr(max_bytes)}\n")
+        ai_agent.max_content_size = 123
+        self.assertIn("123", self._call_tool(ai_agent, "read", {"file_path": "a.txt"}))
+
+    def test_custom_execute_without_timeout(self):
+        ai_agent = self._make_agent(
+            "execute", "def execute(command):\n    return {'success': True, 'result': 'ran ' + command}\n")
+        self.assertIn("ran ls", self._call_tool(ai_agent, "execute", {"command": "ls"}))
+
+    def test_execute_with_kwargs_receives_timeout(self):
+        ai_agent = self._make_agent(
+            "execute", "def execute(command, **kwargs):\n    return {'success': True, 'result': repr(kwargs)}\n")
+        ai_agent.command_timeout = 7
+        self.assertIn("'timeout': 7", self._call_tool(ai_agent, "execute", {"command": "ls"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
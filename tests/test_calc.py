@@ -0,0 +1,29 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+import calc
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        calc._result_cache.clear()
+
+    def test_small_result_is_cached(self):
+        self.assertEqual(calc.execute("2**10"), {"success": True, "result": "计算结果: 1024"})
+        self.assertIn("2**10", calc._result_cache)
+        self.assertEqual(calc.execute("2**10"), {"success": True, "result": "计算结果: 1024"})
+
+    def test_large_result_is_not_cached(self):
+        self.assertTrue(calc.execute("9**3000")["success"])
+        self.assertNotIn("9**3000", calc._result_cache)
+
+    def test_failure_is_not_cached(self):
+        self.assertFalse(calc.execute("1/0")["success"])
+        self.assertNotIn("1/0", calc._result_cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
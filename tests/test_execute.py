@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+import execute
+
+
+@unittest.skipIf(execute._CURRENT_OS == "windows", "依赖POSIX进程组")
+class ExecuteTimeoutTest(unittest.TestCase):
+    def test_foreground_command_times_out(self):
+        start = time.monotonic()
+        result = execute.execute("sleep 30", timeout=1)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertFalse(result["success"])
+        self.assertIn("超时", result["result"])
+
+    def test_backgrounded_child_does_not_outlive_timeout(self):
+        start = time.monotonic()
+        result = execute.execute("sleep 30 &", timeout=1)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertFalse(result["success"])
+        self.assertIn("超时", result["result"])
+
+    def test_fast_command_within_timeout(self):
+        result = execute.execute("echo ok", timeout=10)
+        self.assertEqual(result, {"success": True, "result": "ok\n"})
+
+
+@unittest.skipIf(execute._CURRENT_OS == "windows", "依赖POSIX shell")
+class ExecuteFallbackTest(unittest.TestCase):
+    def test_script_without_shebang_runs_through_shell(self):
+        with tempfile.TemporaryDirectory() as directory:
+            script = os.path.join(directory, "noshebang.sh")
+            with open(script, "w") as f:
+                f.write("echo from-script\n")
+            os.chmod(script, 0o755)
+            result = execute.execute(script, timeout=10)
+        self.assertEqual(result, {"success": True, "result": "from-script\n"})
+
+
+class DecodeOutputTest(unittest.TestCase):
+    def setUp(self):
+        # 固定系统首选编码为UTF-8，使结果不依赖运行环境的区域设置
+        patcher = mock.patch.object(execute, "_FALLBACK_ENCODING", "utf-8")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_utf8_output(self):
+        self.assertEqual(execute._decode_output("中文 ok".encode("utf-8")), "中文 ok")
+
+    def test_short_latin1_is_not_guessed(self):
+        self.assertEqual(execute._decode_output(b"caf\xe9"), "caf\ufffd")
+
+    def test_short_gbk_is_not_guessed(self):
+        data = "你好".encode("gbk")
+        self.assertEqual(execute._decode_output(data), data.decode("utf-8", errors="replace"))
+
+    def test_long_gbk_is_detected(self):
+        try:
+            import charset_normalizer  # noqa: F401
+        except ImportError:
+            self.skipTest("未安装charset_normalizer")
+        text = "中文输出测试，这是一段比较长的命令输出内容。目录不存在，请检查路径是否正确。"
+        self.assertEqual(execute._decode_output(text.encode("gbk")), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,69 +4,137 @@
 """
 import math
 import ast
+import functools
+import sys
+import threading
 import operator as op
+from collections import OrderedDict
+
+# 允许的操作符（模块级常量，导入时构建一次）
+_OPERATORS = {
+    ast.Add: op.add, ast.Sub: op.sub, ast.Mult: op.mul,
+    ast.Div: op.truediv, ast.Pow: op.pow, ast.BitXor: op.xor,
+    ast.USub: op.neg, ast.UAdd: op.pos,
+    ast.FloorDiv: op.floordiv, ast.Mod: op.mod
+}
+
+# 允许的函数和常量
+_SAFE_NAMES = {
+    'abs': abs, 'round': round,
+    'min': min, 'max': max,
+    'sum': sum, 'len': len,
+    # 数学函数
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
+    'sqrt': math.sqrt, 'log': math.log, 'log10': math.log10,
+    'exp': math.exp, 'ceil': math.ceil, 'floor': math.floor,
+    # 常量
+    'pi': math.pi, 'e': math.e
+}
+
+@functools.lru_cache(maxsize=512)
+def _parse_expression(expr: str) -> ast.expr:
+    """解析表达式为AST，按表达式缓存（返回的节点是共享的，不应修改）"""
+    return ast.parse(expr, mode='eval').body
+
+def _eval_constant(node: ast.Constant):
+    # 数字常量（ast.Num自Python 3.8起已弃用，改用ast.Constant并只接受数值）
+    if isinstance(node.value, (int, float, complex)) and not isinstance(node.value, bool):
+        return node.value
+    raise TypeError(f"不支持的表达式类型: {type(node)}")
+
+def _eval_unary_op(node: ast.UnaryOp):
+    # 一元操作符 (比如 -1)
+    return _OPERATORS[type(node.op)](_eval(node.operand))
+
+def _eval_bin_op(node: ast.BinOp):
+    # 二元操作符 (比如 1 + 2)
+    return _OPERATORS[type(node.op)](_eval(node.left), _eval(node.right))
+
+def _eval_call(node: ast.Call):
+    # 函数调用 (比如 sin(0.5))
+    func_name = node.func.id
+    if func_name not in _SAFE_NAMES:
+        raise ValueError(f"函数 '{func_name}' 不在安全函数列表中")
+    args = [_eval(arg) for arg in node.args]
+    return _SAFE_NAMES[func_name](*args)
+
+def _eval_name(node: ast.Name):
+    # 访问允许的变量/常量 (比如 pi)
+    if node.id not in _SAFE_NAMES:
+        raise ValueError(f"变量 '{node.id}' 不在安全变量列表中")
+    return _SAFE_NAMES[node.id]
+
+def _eval_sequence(node):
+    # 元组支持 (比如 min(1, 2, 3))
+    return tuple(_eval(el) for el in node.elts)
+
+# 节点类型 -> 求值函数，每个节点只需一次字典查找，代替逐个isinstance判断
+_NODE_HANDLERS = {
+    ast.Constant: _eval_constant,
+    ast.UnaryOp: _eval_unary_op,
+    ast.BinOp: _eval_bin_op,
+    ast.Call: _eval_call,
+    ast.Name: _eval_name,
+    ast.Tuple: _eval_sequence,
+    ast.List: _eval_sequence
+}
+
+def _eval(node):
+    handler = _NODE_HANDLERS.get(type(node))
+    if handler is None:
+        raise TypeError(f"不支持的表达式类型: {type(node)}")
+    return handler(node)
 
 def safe_eval(expr):
     """
     安全地评估数学表达式
     使用ast模块解析表达式，只允许安全操作
     """
-    # 定义允许的操作符
-    operators = {
-        ast.Add: op.add, ast.Sub: op.sub, ast.Mult: op.mul,
-        ast.Div: op.truediv, ast.Pow: op.pow, ast.BitXor: op.xor,
-        ast.USub: op.neg, ast.UAdd: op.pos,
-        ast.FloorDiv: op.floordiv, ast.Mod: op.mod
-    }
-    
-    # 定义允许的函数和常量
-    safe_names = {
-        'abs': abs, 'round': round,
-        'min': min, 'max': max,
-        'sum': sum, 'len': len,
-        # 数学函数
-        'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-        'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
-        'sqrt': math.sqrt, 'log': math.log, 'log10': math.log10,
-        'exp': math.exp, 'ceil': math.ceil, 'floor': math.floor,
-        # 常量
-        'pi': math.pi, 'e': math.e
-    }
-    
-    def _eval(node):
-        # 数字常量
-        if isinstance(node, ast.Num):
-            return node.n
-        # 一元操作符 (比如 -1)
-        elif isinstance(node, ast.UnaryOp):
-            return operators[type(node.op)](_eval(node.operand))
-        # 二元操作符 (比如 1 + 2)
-        elif isinstance(node, ast.BinOp):
-            return operators[type(node.op)](_eval(node.left), _eval(node.right))
-        # 函数调用 (比如 sin(0.5))
-        elif isinstance(node, ast.Call):
-            func_name = node.func.id
-            if func_name not in safe_names:
-                raise ValueError(f"函数 '{func_name}' 不在安全函数列表中")
-            args = [_eval(arg) for arg in node.args]
-            return safe_names[func_name](*args)
-        # 访问允许的变量/常量 (比如 pi)
-        elif isinstance(node, ast.Name):
-            if node.id not in safe_names:
-                raise ValueError(f"变量 '{node.id}' 不在安全变量列表中")
-            return safe_names[node.id]
-        # 元组支持 (比如 min(1, 2, 3))
-        elif isinstance(node, ast.Tuple) or isinstance(node, ast.List):
-            return tuple(_eval(el) for el in node.elts)
-        else:
-            raise TypeError(f"不支持的表达式类型: {type(node)}")
-    
     try:
-        parsed_expr = ast.parse(expr, mode='eval').body
+        parsed_expr = _parse_expression(expr)
         return _eval(parsed_expr)
     except Exception as e:
         raise ValueError(f"表达式计算失败: {str(e)}")
 
+# 结果缓存最多保存的表达式数
+_RESULT_CACHE_SIZE = 256
+
+# 表达式或结果占用的内存超过此字节数时不缓存，避免缓存长期持有超大整数或元组
+_RESULT_CACHE_MAX_BYTES = 1024
+
+# 表达式 -> 计算结果，按最近使用顺序淘汰
+_result_cache: "OrderedDict[str, object]" = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+def _result_size(result) -> int:
+    """估算计算结果占用的内存（元组计入各元素，超过缓存上限后不再继续累加）"""
+    size = sys.getsizeof(result)
+    if isinstance(result, tuple):
+        for item in result:
+            size += _result_size(item)
+            if size > _RESULT_CACHE_MAX_BYTES:
+                break
+    return size
+
+def _safe_eval_cached(expr: str):
+    """计算字符串表达式，表达式和结果都足够小时缓存结果
+    
+    求值没有副作用，结果都是不可变的数值或元组；计算失败时抛出异常，不缓存。
+    """
+    with _result_cache_lock:
+        if expr in _result_cache:
+            _result_cache.move_to_end(expr)
+            return _result_cache[expr]
+    
+    result = safe_eval(expr)
+    if sys.getsizeof(expr) <= _RESULT_CACHE_MAX_BYTES and _result_size(result) <= _RESULT_CACHE_MAX_BYTES:
+        with _result_cache_lock:
+            _result_cache[expr] = result
+            if len(_result_cache) > _RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+    return result
+
 def execute(expression):
     """
     计算Python表达式的值
@@ -79,7 +147,8 @@ def execute(expression):
     """
     try:
         # 尝试安全地计算表达式
-        result = safe_eval(expression)
+        # 模型经常重复同一表达式，字符串表达式的较小结果直接从缓存返回
+        result = _safe_eval_cached(expression) if isinstance(expression, str) else safe_eval(expression)
         
         return {
             "success": True,
@@ -6,8 +6,200 @@ import subprocess
 import platform
 import os
 import shlex
+import re
 import json
 import uuid
+import locale
+import codecs
+import functools
+import signal
+import threading
+import time
+from typing import Optional
+
+# 当前操作系统在进程生命周期内不变，导入时探测一次
+_CURRENT_OS = platform.system().lower()
+
+# 命令输出不是合法UTF-8时使用的系统首选编码（如中文Windows下为cp936）
+_FALLBACK_ENCODING = locale.getpreferredencoding(False) or 'utf-8'
+
+# 每个输出流最多保留的字节数，超出部分读取后直接丢弃（工具结果最终只保留前4000个字符）
+_MAX_OUTPUT_BYTES = 64 * 1024
+
+# 单次从管道读取的字节数
+_READ_CHUNK_SIZE = 64 * 1024
+
+# 需要由shell解释的字符（管道、重定向、变量、通配符、命令替换、多条命令等）
+_SHELL_META_RE = re.compile(r'[|&;<>$`(){}*?\[\]~!#=\n\\]')
+
+def _popen(command: str) -> subprocess.Popen:
+    """启动命令进程
+    
+    非Windows系统上，不含shell特殊字符的简单命令直接执行，省去中间的 /bin/sh 进程；
+    其他命令（以及直接执行时找不到的命令，如shell内建命令）交给shell执行。
+    """
+    popen_kwargs = {
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.PIPE,
+        "bufsize": _READ_CHUNK_SIZE,
+        "text": False  # 使用二进制模式避免编码问题
+    }
+    if _CURRENT_OS != "windows":
+        # 命令及其子进程放入独立的进程组，超时时可以一并终止
+        popen_kwargs["start_new_session"] = True
+    if _CURRENT_OS != "windows" and not _SHELL_META_RE.search(command):
+        try:
+            args = shlex.split(command)
+        except ValueError:
+            args = None
+        if args:
+            try:
+                return subprocess.Popen(args, shell=False, **popen_kwargs)
+            except OSError:
+                # 直接执行失败（找不到命令、没有执行权限、没有shebang的脚本等）时交给shell处理，
+                # 保持与shell执行一致的行为
+                pass
+    return subprocess.Popen(command, shell=True, **popen_kwargs)
+
+def _kill_process_tree(process: subprocess.Popen) -> None:
+    """终止命令进程；非Windows系统上终止整个进程组（包括shell启动的子进程）"""
+    try:
+        if _CURRENT_OS != "windows":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+    process.wait()
+
+# 编码探测只检查输出开头的这么多字节
+_DETECT_SAMPLE_SIZE = 4096
+
+# 样本短于此长度时不做编码探测（短样本的探测结果基本不可信）
+_DETECT_MIN_BYTES = 64
+
+# 探测结果的混乱度(chaos)超过此值时视为不可信
+_DETECT_MAX_CHAOS = 0.1
+
+def _strict_decode(data: bytes, encoding: str, truncated: bool) -> str:
+    """按指定编码严格解码，截断的输出忽略末尾不完整的字符；无法解码时抛出UnicodeDecodeError"""
+    if truncated:
+        return codecs.getincrementaldecoder(encoding)().decode(data, final=False)
+    return data.decode(encoding)
+
+def _detect_encoding(sample: bytes) -> Optional[str]:
+    """探测输出样本的编码
+    
+    只接受足够长、混乱度足够低的探测结果；charset_normalizer不可用、样本过短或结果不可信时返回None。
+    宁可保留可见的替换字符，也不要返回看似合理的错误文本。
+    """
+    if len(sample) < _DETECT_MIN_BYTES:
+        return None
+    try:
+        # 延迟导入: 只有输出既不是UTF-8也不是系统首选编码时才需要
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return None
+    best = from_bytes(sample).best()
+    if best is None or best.chaos > _DETECT_MAX_CHAOS:
+        return None
+    try:
+        return codecs.lookup(best.encoding).name
+    except LookupError:
+        return None
+
+def _decode_output(data: bytes, truncated: bool = False) -> str:
+    """解码命令输出: 依次尝试UTF-8和系统首选编码，都失败时按开头样本探测一次编码；
+    探测结果不可信时按UTF-8解码（无法解码的字节替换）
+    
+    Args:
+        data: 命令输出的字节
+        truncated: 输出是否被截断（截断处可能切断一个多字节字符，此时忽略末尾不完整的字符）
+    """
+    if not data:
+        return ""
+    try:
+        return _strict_decode(data, 'utf-8', truncated)
+    except UnicodeDecodeError:
+        pass
+    if codecs.lookup(_FALLBACK_ENCODING).name != 'utf-8':
+        try:
+            return _strict_decode(data, _FALLBACK_ENCODING, truncated)
+        except UnicodeDecodeError:
+            pass
+    encoding = _detect_encoding(data[:_DETECT_SAMPLE_SIZE]) or 'utf-8'
+    return data.decode(encoding, errors='replace')
+
+def _read_bounded(pipe, result: list) -> None:
+    """读取管道直到结束，只保留前_MAX_OUTPUT_BYTES字节
+    
+    超出部分继续读取并丢弃，避免子进程因管道写满而阻塞。结果以(保留的字节, 总字节数)追加到result。
+    """
+    kept = bytearray()
+    total = 0
+    with pipe:
+        while True:
+            chunk = pipe.read1(_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if len(kept) < _MAX_OUTPUT_BYTES:
+                kept += chunk[:_MAX_OUTPUT_BYTES - len(kept)]
+    result.append((bytes(kept), total))
+
+def _collect_output(read_result: list) -> str:
+    """解码_read_bounded读取的输出，被截断时附加说明"""
+    data, total = read_result[0] if read_result else (b"", 0)
+    truncated = total > len(data)
+    text = _decode_output(data, truncated)
+    if truncated:
+        text += f"\n... [输出已截断，共 {total} 字节]"
+    return text
+
+def _first_token(command: str) -> str:
+    """提取命令的第一个词（命令名）
+    
+    不含引号和反斜杠时直接按空白切分，结果与shlex.split相同；
+    否则交给shlex处理引号和转义（引号不闭合时抛出ValueError）。
+    """
+    parts = command.split(None, 1)
+    if not parts:
+        return ""
+    token = parts[0]
+    if "'" in token or '"' in token or "\\" in token:
+        cmd_parts = shlex.split(command)
+        return cmd_parts[0] if cmd_parts else ""
+    return token
+
+@functools.lru_cache(maxsize=4)
+def _load_sensitive_matcher(config_path: str, mtime_ns: int, file_size: int) -> tuple:
+    """加载敏感命令配置并为当前操作系统构建匹配器（按路径、修改时间和大小缓存，配置变化时自动重新加载）
+    
+    Returns:
+        (按配置顺序排列的[(模式, 描述)], {模式: 描述}, 所有模式的交替正则；没有适用的模式时为None)
+    """
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            sensitive_commands = json.load(f).get("sensitive_commands", [])
+    except Exception:
+        sensitive_commands = []
+    
+    ordered_patterns = []
+    pattern_map = {}
+    for sensitive_cmd in sensitive_commands:
+        pattern = sensitive_cmd.get("pattern", "").lower()
+        cmd_os = sensitive_cmd.get("os", [])
+        # 如果该命令适用于当前操作系统
+        if not cmd_os or _CURRENT_OS in cmd_os:
+            description = sensitive_cmd.get("description", "敏感命令")
+            ordered_patterns.append((pattern, description))
+            pattern_map.setdefault(pattern, description)
+    
+    if not ordered_patterns:
+        return [], {}, None
+    # 一次C层面的扫描判断是否有任一模式出现在命令中，代替逐个模式的子串查找
+    regex = re.compile("|".join(re.escape(p) for p, _ in ordered_patterns))
+    return ordered_patterns, pattern_map, regex
 
 def is_sensitive_command(command: str) -> tuple:
     """检查命令是否为敏感命令
@@ -18,44 +210,36 @@ def is_sensitive_command(command: str) -> tuple:
     Returns:
         (是否敏感, 敏感描述)
     """
-    # 加载敏感命令配置
-    if os.path.exists("security.json"):
-        try:
-            with open("security.json", 'r', encoding='utf-8') as f:
-                security_config = json.load(f)
-                sensitive_commands = security_config.get("sensitive_commands", [])
-        except Exception:
-            sensitive_commands = []
-    else:
-        sensitive_commands = []
+    # 加载敏感命令配置（只stat一次，内容未变化时复用已构建的匹配器）
+    config_path = os.path.abspath("security.json")
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return False, ""
+    ordered_patterns, pattern_map, regex = _load_sensitive_matcher(config_path, st.st_mtime_ns, st.st_size)
     
-    if not sensitive_commands:
+    if regex is None:
         return False, ""
         
-    current_os = platform.system().lower()
     # 解析命令获取第一个部分（命令名）
     try:
-        cmd_parts = shlex.split(command)
-        if not cmd_parts:
+        base_cmd = _first_token(command).lower()
+        if not base_cmd:
             return False, ""
         
-        base_cmd = cmd_parts[0].lower()
+        # 没有任何模式出现在命令中，且命令名也不以某个模式开头时，不是敏感命令（常见情况，只需一次扫描）
+        if not regex.search(command) and base_cmd not in pattern_map and " " not in base_cmd:
+            return False, ""
         
-        # 检查是否为定义的敏感命令
-        for sensitive_cmd in sensitive_commands:
-            pattern = sensitive_cmd.get("pattern", "").lower()
-            # 检查操作系统兼容性
-            cmd_os = sensitive_cmd.get("os", [])
+        # 按配置顺序找出第一个匹配的定义，与逐个检查时返回的描述一致
+        for pattern, description in ordered_patterns:
+            # 精确匹配命令开头
+            if base_cmd == pattern or base_cmd.startswith(pattern + " "):
+                return True, description
             
-            # 如果该命令适用于当前操作系统
-            if not cmd_os or current_os in cmd_os:
-                # 精确匹配命令开头
-                if base_cmd == pattern or base_cmd.startswith(pattern + " "):
-                    return True, sensitive_cmd.get("description", "敏感命令")
-                
-                # 检查命令选项中的敏感模式
-                if pattern in command:
-                    return True, sensitive_cmd.get("description", "敏感命令")
+            # 检查命令选项中的敏感模式
+            if pattern in command:
+                return True, description
         
         return False, ""
         
@@ -63,11 +247,12 @@ def is_sensitive_command(command: str) -> tuple:
         print(f"检查敏感命令异常: {e}")
         return False, ""
 
-def execute(command: str) -> dict:
+def execute(command: str, timeout: Optional[float] = None) -> dict:
     """执行系统命令
     
     Args:
         command: 要执行的命令
+        timeout: 命令最长运行时间（秒），超时后终止命令；为None时不限制
         
     Returns:
         包含成功状态和结果的字典
@@ -88,45 +273,45 @@ def execute(command: str) -> dict:
             }
         
         # 使用subprocess执行命令并捕获输出
-        process = subprocess.Popen(
-            command, 
-            shell=True,
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            text=False  # 使用二进制模式避免编码问题
-        )
+        process = _popen(command)
         
-        # 读取二进制输出并尝试多种编码
-        stdout_binary, stderr_binary = process.communicate()
+        # 两个输出流分别在线程中读取（管道不支持跨平台的select），每个流只保留有限的前缀
+        stdout_result, stderr_result = [], []
+        readers = [
+            threading.Thread(target=_read_bounded, args=(process.stdout, stdout_result), daemon=True),
+            threading.Thread(target=_read_bounded, args=(process.stderr, stderr_result), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+        # 等待进程和读取线程共用同一个截止时间：shell退出后，后台子进程仍可能持有管道
+        deadline = None if timeout is None else time.monotonic() + timeout
         
-        # 尝试不同的编码来解码输出
-        encodings = ['utf-8', 'latin1', 'gbk', 'cp1252']
-        stdout = None
-        stderr = None
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
         
-        for encoding in encodings:
-            try:
-                if stdout is None and stdout_binary:
-                    stdout = stdout_binary.decode(encoding, errors='replace')
-                if stderr is None and stderr_binary:
-                    stderr = stderr_binary.decode(encoding, errors='replace')
-                if stdout is not None and stderr is not None:
-                    break
-            except UnicodeDecodeError:
-                continue
+        timed_out = False
+        try:
+            process.wait(timeout=remaining())
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        if not timed_out:
+            for reader in readers:
+                reader.join(timeout=remaining())
+            timed_out = any(reader.is_alive() for reader in readers)
+        if timed_out:
+            # 进程组在start_new_session下独立存在，shell已退出时也能终止其中的后台子进程
+            _kill_process_tree(process)
+            for reader in readers:
+                # 脱离进程组的子进程可能仍持有管道，此时不再等待
+                reader.join(timeout=5)
         
-        # 如果所有编码都尝试失败，使用latin1（它可以解码任何字节序列）
-        if stdout is None and stdout_binary:
-            stdout = stdout_binary.decode('latin1', errors='replace')
-        if stderr is None and stderr_binary:
-            stderr = stderr_binary.decode('latin1', errors='replace')
+        stdout = _collect_output(stdout_result)
+        stderr = _collect_output(stderr_result)
         
-        if not stdout:
-            stdout = ""
-        if not stderr:
-            stderr = ""
-            
-        if process.returncode != 0:
+        if timed_out:
+            output = f"命令执行超时（超过 {timeout} 秒），已终止:\n{stderr}\n{stdout}"
+            success = False
+        elif process.returncode != 0:
             if stderr:
                 output = f"命令执行错误 (返回码: {process.returncode}):\n{stderr}\n{stdout}"
             else:
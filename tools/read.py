@@ -3,25 +3,64 @@
 """
 
 import os
+import codecs
+import mmap
+from typing import Optional
 
-def execute(file_path: str) -> dict:
+# 超过此大小的文件完整读取时通过mmap映射后直接解码，省去先读入一份完整字节副本
+_MMAP_THRESHOLD = 1024 * 1024
+
+def _normalize_newlines(content: str) -> str:
+    """按文本模式的规则把\r\n和单独的\r转换为\n"""
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+def _read_file(abs_path: str, file_size: int, max_bytes: Optional[int]) -> str:
+    """读取并解码文件内容"""
+    if max_bytes is not None and file_size > max_bytes:
+        # 大文件只读取需要保留的前缀，不把整个文件读入内存
+        with open(abs_path, 'rb') as f:
+            data = f.read(max_bytes)
+        # 截断处可能切断一个多字节字符，忽略末尾不完整的字符
+        content = codecs.getincrementaldecoder('utf-8')(errors='replace').decode(data, final=False)
+        return _normalize_newlines(content) + f"\n... [文件过大，仅读取前 {max_bytes} 字节，共 {file_size} 字节]"
+    
+    with open(abs_path, 'rb') as f:
+        if file_size >= _MMAP_THRESHOLD:
+            # 直接从页缓存映射解码为字符串，只经过一次解码
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    content = str(view, 'utf-8', 'replace')
+                finally:
+                    view.release()
+        else:
+            content = f.read().decode('utf-8', errors='replace')
+    return _normalize_newlines(content)
+
+def execute(file_path: str, max_bytes: Optional[int] = None) -> dict:
     """读取文件内容
     
     Args:
         file_path: 要读取的文件路径
+        max_bytes: 最多读取的字节数，文件超过此大小时只读取并解码开头部分（None表示不限制）
         
     Returns:
         包含成功状态和结果的字典
     """
     try:
-        if not os.path.exists(file_path):
+        abs_path = os.path.abspath(file_path)
+        try:
+            # 直接stat，文件不存在时捕获异常，不再先单独检查是否存在
+            st = os.stat(abs_path)
+        except FileNotFoundError:
             return {
                 "success": False,
                 "result": f"文件不存在: {file_path}"
             }
         
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+        content = _read_file(abs_path, st.st_size, max_bytes)
         
         return {
             "success": True,
@@ -16,17 +16,24 @@ def execute(file_path: str, content: str, mode: str = "w") -> dict:
         包含成功状态和结果的字典
     """
     try:
-        # 确保目录存在
+        # 确保目录存在（exist_ok避免先检查再创建的竞争，也省去一次stat）
         directory = os.path.dirname(file_path)
-        if directory and not os.path.exists(directory):
-            os.makedirs(directory)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
             
-        with open(file_path, mode, encoding='utf-8') as f:
-            f.write(content)
+        # 一次性编码后以二进制写入，跳过文本模式的编码器与换行转换层；
+        # 换行符仍按文本模式的规则转换为系统换行符，保证写出的内容不变
+        if os.linesep != '\n':
+            content = content.replace('\n', os.linesep)
+        data = content.encode('utf-8')
+        # 去掉调用方可能给出的't'/'b'（如'wt'、'ab'），统一以二进制模式打开
+        binary_mode = mode.replace('t', '').replace('b', '') + 'b'
+        with open(file_path, binary_mode) as f:
+            f.write(data)
         
         return {
             "success": True,
-            "result": f"文件{'追加' if mode == 'a' else '写入'}成功: {file_path}"
+            "result": f"文件{'追加' if 'a' in binary_mode else '写入'}成功: {file_path}"
         }
     except Exception as e:
         return {